@@ -6,238 +6,456 @@ Author: Your Name
 Date: October 6, 2025
 """
 
-import requests
+import asyncio
+import aiohttp
+import orjson
 import json
 import time
 import os
 from datetime import datetime
 import sqlite3
 import sys
+from pathlib import Path
+
+USER_AGENT = "DayZModNotifier/1.0"
+
+# Configuration, read once from the environment
+DISCORD_WEBHOOK_URL = os.environ.get("DISCORD_WEBHOOK_URL")
+STEAM_API_KEY = os.environ.get("STEAM_API_KEY")
+
+# Your server mod IDs, edited in mods.json next to this script
+MODS_FILE = Path(__file__).with_name("mods.json")
+
+def load_mod_ids(path=MODS_FILE):
+    """Load mod IDs from a JSON list, dropping duplicates but keeping order"""
+    return tuple(dict.fromkeys(str(mod_id) for mod_id in json.loads(path.read_bytes())))
+
+MOD_IDS = load_mod_ids()
 
 class DayZModNotifier:
-    def __init__(self, discord_webhook_url, steam_api_key):
+    # Steam API accepts at most 100 mods per request
+    BATCH_SIZE = 100
+    # Form keys for the mod IDs in a Steam API request, built once
+    PUBLISHED_FILE_KEYS = [f'publishedfileids[{i}]' for i in range(BATCH_SIZE)]
+    
+    # Retry policy for rate limits and server errors on HTTP requests
+    RETRY_TOTAL = 3
+    RETRY_BACKOFF_FACTOR = 0.5
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+    
+    # Discord webhook limits
+    MAX_FIELDS_PER_EMBED = 25
+    MAX_EMBEDS_PER_MESSAGE = 10
+    MAX_EMBED_CHARS_PER_MESSAGE = 6000
+    
+    # Fixed parts of the Discord notification, shared by every call
+    EMBED_COLOR = 0x00ff00  # Green color
+    EMBED_HEADER = {
+        "title": "🔄 DayZ Server Mod Updates Detected!",
+        "footer": {
+            "text": "GTX Gaming DayZ Server Monitor"
+        }
+    }
+    # Warning about server restart
+    ACTION_FIELD = {
+        "name": "⚠️ Action Required",
+        "value": "Your GTX Gaming server may need to be restarted to apply these mod updates.",
+        "inline": False
+    }
+    NOTIFICATION_CONTENT = "@here Mod updates detected for DayZ server!"
+    
+    # Upsert, because another process sharing the database may already have
+    # added a mod that this instance's cache still treats as new
+    INSERT_MOD_SQL = '''
+        INSERT INTO mod_updates (mod_id, last_updated, mod_name, last_checked)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(mod_id) DO UPDATE
+        SET last_updated = excluded.last_updated, mod_name = excluded.mod_name,
+            last_checked = excluded.last_checked
+        WHERE excluded.last_updated > mod_updates.last_updated
+    '''
+    UPDATE_MOD_SQL = '''
+        UPDATE mod_updates 
+        SET last_updated = ?, mod_name = ?, last_checked = ?
+        WHERE mod_id = ? AND last_updated < ?
+    '''
+    SET_LAST_CHECKED_SQL = "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_checked', ?)"
+
+    def __init__(self, discord_webhook_url, steam_api_key, dry_run=False):
         self.discord_webhook_url = discord_webhook_url
         self.steam_api_key = steam_api_key
+        # Skip Discord notifications and roll back database writes, e.g. for
+        # CI and profiling runs
+        self.dry_run = dry_run
         self.db_file = "mod_updates.db"
-        self.init_database()
         
         # Your server mod IDs
-        self.mod_ids = [
-            "2579252958", "3413364741", "2628707698", "1710977250", "2794690371",
-            "2705731852", "1565871491", "1932611410", "3353822981", "1559212036",
-            "2851058261", "3347202534", "1646187754", "1564026768", "2810212624",
-            "3071767590", "3051379451", "2545327648", "2794626429", "1750506510",
-            "2714183642", "2931436407", "2246697421", "2428595209", "3487506464",
-            "2903723881", "2181531192", "2601606391", "1964490092", "3495385414",
-            "3494856709", "3577460706", "3483591601", "3483631928", "3483633965",
-            "3566588945", "3492829525", "3485866845", "3520324415", "3495004422",
-            "3440974241", "3452063031", "3049835903", "3419019141", "3007376094",
-            "2663169692", "2299460322", "2913803769", "3390675689", "3219973018",
-            "2842779598", "2007900691", "3332001143", "2878980498", "3310715247",
-            "3117613872", "2879070654", "2692979668", "2848159851", "3528780688",
-            "2936585965", "2443122116", "3439337803", "2458896948", "1828439124",
-            "1797720064", "3017273820", "3036319373"
-        ]
+        self.mod_ids = MOD_IDS
+        
+        # Long-lived database connection, closed in close()
+        self.conn = self.connect_database()
+        self.init_database()
+        
+        # Stored update times for all mods, loaded in a single query and kept
+        # in sync with the database after every check
+        placeholders = ','.join('?' * len(self.mod_ids))
+        self.last_updated_cache = dict(self.conn.execute(
+            f'SELECT mod_id, last_updated FROM mod_updates WHERE mod_id IN ({placeholders})',
+            self.mod_ids
+        ).fetchall())
+
+    def connect_database(self):
+        """Open a connection to the SQLite database with tuned PRAGMAs"""
+        conn = sqlite3.connect(self.db_file, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        conn.execute('PRAGMA cache_size=-64000')  # 64 MB page cache
+        conn.execute('PRAGMA mmap_size=268435456')  # 256 MB
+        return conn
 
     def init_database(self):
         """Initialize SQLite database to track mod update times"""
-        conn = sqlite3.connect(self.db_file)
-        cursor = conn.cursor()
+        cursor = self.conn.cursor()
+        # WITHOUT ROWID stores rows in the primary key B-tree, so lookups by mod_id
+        # already read last_updated without a separate index
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS mod_updates (
                 mod_id TEXT PRIMARY KEY,
                 last_updated INTEGER,
                 mod_name TEXT,
                 last_checked INTEGER
-            )
+            ) WITHOUT ROWID
         ''')
-        conn.commit()
-        conn.close()
+        # Run-wide values such as the last successful check time
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER
+            ) WITHOUT ROWID
+        ''')
+        
+        # Migrate databases created before mod_updates was a WITHOUT ROWID table
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'mod_updates'")
+        if 'WITHOUT ROWID' not in cursor.fetchone()[0].upper():
+            print("Migrating mod_updates table to WITHOUT ROWID layout")
+            with self.conn:
+                self.conn.execute('BEGIN IMMEDIATE')
+                cursor.execute('''
+                    CREATE TABLE mod_updates_new (
+                        mod_id TEXT PRIMARY KEY,
+                        last_updated INTEGER,
+                        mod_name TEXT,
+                        last_checked INTEGER
+                    ) WITHOUT ROWID
+                ''')
+                cursor.execute('''
+                    INSERT INTO mod_updates_new (mod_id, last_updated, mod_name, last_checked)
+                    SELECT mod_id, last_updated, mod_name, last_checked FROM mod_updates
+                ''')
+                cursor.execute('DROP TABLE mod_updates')
+                cursor.execute('ALTER TABLE mod_updates_new RENAME TO mod_updates')
+
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
+
+    def create_session(self):
+        """Create the HTTP session shared by Steam and Discord requests"""
+        timeout = aiohttp.ClientTimeout(total=30)
+        headers = {"User-Agent": USER_AGENT}
+        return aiohttp.ClientSession(timeout=timeout, headers=headers)
+
+    async def get_retry_after(self, response):
+        """Return the delay a 429 response asks for, or None if it gives none"""
+        # Discord sends retry_after in the JSON body; others use the header
+        try:
+            retry_after = orjson.loads(await response.read()).get('retry_after')
+        except (orjson.JSONDecodeError, AttributeError):
+            retry_after = None
+        if retry_after is None:
+            retry_after = response.headers.get('Retry-After')
+        try:
+            return float(retry_after)
+        except (TypeError, ValueError):
+            return None
 
-    def get_mod_info(self, mod_ids_batch):
+    async def post_with_retry(self, session, url, **kwargs):
+        """POST to url, retrying 429 and 5xx responses with exponential backoff"""
+        for attempt in range(self.RETRY_TOTAL + 1):
+            async with session.post(url, **kwargs) as response:
+                if response.status not in self.RETRY_STATUSES or attempt == self.RETRY_TOTAL:
+                    response.raise_for_status()
+                    return await response.read()
+                
+                status = response.status
+                delay = self.RETRY_BACKOFF_FACTOR * 2 ** attempt
+                if status == 429:
+                    delay = await self.get_retry_after(response) or delay
+            
+            print(f"HTTP {status} received, retrying in {delay:.1f} seconds...")
+            await asyncio.sleep(delay)
+
+    async def get_mod_info(self, session, semaphore, mod_ids_batch):
         """Get mod information from Steam API"""
         url = "https://api.steampowered.com/ISteamRemoteStorage/GetPublishedFileDetails/v1/"
         
         data = {
             'key': self.steam_api_key,
             'itemcount': len(mod_ids_batch),
-            'format': 'json'
+            'format': 'json',
+            **dict(zip(self.PUBLISHED_FILE_KEYS, mod_ids_batch))
         }
         
-        for i, mod_id in enumerate(mod_ids_batch):
-            data[f'publishedfileids[{i}]'] = mod_id
-        
         try:
-            response = requests.post(url, data=data, timeout=30)
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
+            async with semaphore:
+                return orjson.loads(await self.post_with_retry(session, url, data=data))
+        except (aiohttp.ClientError, asyncio.TimeoutError, orjson.JSONDecodeError) as e:
             print(f"Error fetching mod info: {e}")
             return None
 
-    def check_for_updates(self):
+    async def fetch_all_mod_info(self, session):
+        """Fetch all mod batches from Steam API concurrently"""
+        # Limit concurrent requests to avoid rate limiting
+        semaphore = asyncio.Semaphore(4)
+        tasks = [
+            self.get_mod_info(session, semaphore, self.mod_ids[i:i + self.BATCH_SIZE])
+            for i in range(0, len(self.mod_ids), self.BATCH_SIZE)
+        ]
+        return await asyncio.gather(*tasks)
+
+    async def check_for_updates(self, session):
         """Check all mods for updates"""
-        conn = sqlite3.connect(self.db_file)
-        cursor = conn.cursor()
+        cursor = self.conn.cursor()
         
         updated_mods = []
+        inserts = []
+        bumps = []
+        checked = False
+        now = int(time.time())
         
-        # Process mods in batches of 100 (Steam API limit)
-        batch_size = 100
-        for i in range(0, len(self.mod_ids), batch_size):
-            batch = self.mod_ids[i:i + batch_size]
-            mod_data = self.get_mod_info(batch)
-            
+        cache = self.last_updated_cache
+        details = []
+        for mod_data in await self.fetch_all_mod_info(session):
             if not mod_data or 'response' not in mod_data:
                 continue
-                
-            for file_details in mod_data['response']['publishedfiledetails']:
-                if file_details['result'] != 1:  # Success
-                    continue
-                    
-                mod_id = file_details['publishedfileid']
+            checked = True
+            details.extend(mod_data['response']['publishedfiledetails'])
+        
+        # Keep only new or updated mods before doing any database work
+        changed = {
+            d['publishedfileid']: d for d in details
+            if d['result'] == 1  # Success
+            and d.get('time_updated', 0) > cache.get(d['publishedfileid'], -1)
+        }
+        
+        # Write all changes in a single transaction
+        with self.conn:
+            self.conn.execute('BEGIN IMMEDIATE')
+            
+            # Re-read the changed mods under the write lock, since another process
+            # sharing the database may already have recorded these updates
+            stored = {}
+            if changed:
+                placeholders = ','.join('?' * len(changed))
+                cursor.execute(
+                    f'SELECT mod_id, last_updated FROM mod_updates WHERE mod_id IN ({placeholders})',
+                    list(changed)
+                )
+                stored = dict(cursor.fetchall())
+            
+            # Values the database holds once this transaction commits
+            new_cache = {}
+            for mod_id, file_details in changed.items():
                 mod_name = file_details.get('title', f'Mod {mod_id}')
                 last_updated = file_details.get('time_updated', 0)
+                result = stored.get(mod_id)
                 
-                # Check if mod exists in database
-                cursor.execute('SELECT last_updated FROM mod_updates WHERE mod_id = ?', (mod_id,))
-                result = cursor.fetchone()
+                if result is not None and result >= last_updated:
+                    # Already recorded by another process sharing the database
+                    new_cache[mod_id] = result
+                    continue
+                new_cache[mod_id] = last_updated
                 
                 if result is None:
                     # New mod, add to database
-                    cursor.execute('''
-                        INSERT INTO mod_updates (mod_id, last_updated, mod_name, last_checked)
-                        VALUES (?, ?, ?, ?)
-                    ''', (mod_id, last_updated, mod_name, int(time.time())))
+                    inserts.append((mod_id, last_updated, mod_name, now))
                     print(f"Added new mod to tracking: {mod_name}")
                     
-                elif result[0] < last_updated:
+                else:
                     # Mod has been updated
-                    cursor.execute('''
-                        UPDATE mod_updates 
-                        SET last_updated = ?, mod_name = ?, last_checked = ?
-                        WHERE mod_id = ?
-                    ''', (last_updated, mod_name, int(time.time()), mod_id))
+                    bumps.append((last_updated, mod_name, now, mod_id, last_updated))
                     
                     updated_mods.append({
                         'id': mod_id,
                         'name': mod_name,
-                        'updated': datetime.fromtimestamp(last_updated).strftime('%Y-%m-%d %H:%M:%S'),
+                        'updated': last_updated,
                         'url': f'https://steamcommunity.com/sharedfiles/filedetails/?id={mod_id}'
                     })
-                    
-                else:
-                    # Update last checked time
-                    cursor.execute('''
-                        UPDATE mod_updates 
-                        SET last_checked = ?
-                        WHERE mod_id = ?
-                    ''', (int(time.time()), mod_id))
             
-            # Small delay between batches to avoid rate limiting
-            time.sleep(1)
+            cursor.executemany(self.INSERT_MOD_SQL, inserts)
+            cursor.executemany(self.UPDATE_MOD_SQL, bumps)
+            # Record the check once instead of touching every unchanged mod
+            if checked:
+                cursor.execute(self.SET_LAST_CHECKED_SQL, (now,))
+            
+            # Dry runs still exercise the writes but roll them back and leave the
+            # cache alone, so the next real run announces the same updates
+            if self.dry_run:
+                self.conn.rollback()
+                return updated_mods
         
-        conn.commit()
-        conn.close()
+        cache.update(new_cache)
         
         return updated_mods
 
-    def send_discord_notification(self, updated_mods):
-        """Send Discord notification about updated mods"""
-        if not updated_mods:
-            return
-            
-        embed = {
-            "title": "🔄 DayZ Server Mod Updates Detected!",
+    def build_discord_payloads(self, updated_mods):
+        """Split updated mods into Discord webhook payloads within embed limits"""
+        fields = [{
+            "name": f"📦 {mod['name']}",
+            "value": f"<t:{mod['updated']}:R> · [Workshop]({mod['url']})",
+            "inline": True
+        } for mod in updated_mods]
+        fields.append(self.ACTION_FIELD)
+        
+        embeds = [
+            {
+                "color": self.EMBED_COLOR,
+                "fields": fields[i:i + self.MAX_FIELDS_PER_EMBED]
+            }
+            for i in range(0, len(fields), self.MAX_FIELDS_PER_EMBED)
+        ]
+        embeds[0] = {
+            **self.EMBED_HEADER,
+            **embeds[0],
             "description": f"**{len(updated_mods)} mod(s) have been updated**",
-            "color": 0x00ff00,  # Green color
-            "timestamp": datetime.now().isoformat(),
-            "footer": {
-                "text": "GTX Gaming DayZ Server Monitor"
-            },
-            "fields": []
+            "timestamp": datetime.now().isoformat()
         }
         
-        for mod in updated_mods[:10]:  # Limit to 10 mods to avoid embed limits
-            embed["fields"].append({
-                "name": f"📦 {mod['name']}",
-                "value": f"**Updated:** {mod['updated']}\n**ID:** `{mod['id']}`\n[View on Workshop]({mod['url']})",
-                "inline": True
-            })
-        
-        if len(updated_mods) > 10:
-            embed["fields"].append({
-                "name": "➕ Additional Updates",
-                "value": f"And {len(updated_mods) - 10} more mods were updated.",
-                "inline": False
-            })
-        
-        # Add warning about server restart
-        embed["fields"].append({
-            "name": "⚠️ Action Required",
-            "value": "Your GTX Gaming server may need to be restarted to apply these mod updates.",
-            "inline": False
-        })
-        
-        payload = {
-            "embeds": [embed],
-            "content": "@here Mod updates detected for DayZ server!"
-        }
+        # Pack embeds into as few messages as Discord allows
+        payloads = []
+        message_chars = 0
+        for embed in embeds:
+            embed_chars = (
+                len(embed.get("title", "")) + len(embed.get("description", ""))
+                + len(embed.get("footer", {}).get("text", ""))
+                + sum(len(field["name"]) + len(field["value"]) for field in embed["fields"])
+            )
+            if (not payloads
+                    or len(payloads[-1]["embeds"]) >= self.MAX_EMBEDS_PER_MESSAGE
+                    or message_chars + embed_chars > self.MAX_EMBED_CHARS_PER_MESSAGE):
+                payloads.append({"embeds": []})
+                message_chars = 0
+            payloads[-1]["embeds"].append(embed)
+            message_chars += embed_chars
         
+        payloads[0]["content"] = self.NOTIFICATION_CONTENT
+        return payloads
+
+    async def post_discord_payload(self, session, payload):
+        """Post a single payload to the Discord webhook"""
         try:
-            response = requests.post(self.discord_webhook_url, json=payload, timeout=10)
-            response.raise_for_status()
-            print(f"Discord notification sent for {len(updated_mods)} updated mods")
-        except requests.RequestException as e:
+            await self.post_with_retry(session, self.discord_webhook_url, data=orjson.dumps(payload),
+                                       headers={"Content-Type": "application/json"},
+                                       timeout=aiohttp.ClientTimeout(total=10))
+            return True
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             print(f"Error sending Discord notification: {e}")
+            return False
+
+    async def send_discord_notification(self, session, updated_mods):
+        """Send Discord notification about updated mods"""
+        if not updated_mods:
+            return
+        
+        # Post one message at a time so the first one, with the title and
+        # @here mention, always appears above the overflow embeds
+        results = []
+        for payload in self.build_discord_payloads(updated_mods):
+            results.append(await self.post_discord_payload(session, payload))
+        
+        if all(results):
+            print(f"Discord notification sent for {len(updated_mods)} updated mods")
 
     def run_check(self):
         """Run a single check for mod updates"""
+        async def check_once():
+            async with self.create_session() as session:
+                await self.run_check_async(session)
+        
+        asyncio.run(check_once())
+
+    async def run_check_async(self, session):
+        """Check for mod updates and notify Discord"""
         print(f"Checking for mod updates at {datetime.now()}")
-        updated_mods = self.check_for_updates()
+        updated_mods = await self.check_for_updates(session)
         
         if updated_mods:
             print(f"Found {len(updated_mods)} updated mods:")
             for mod in updated_mods:
                 print(f"  - {mod['name']} (ID: {mod['id']})")
-            self.send_discord_notification(updated_mods)
+            if self.dry_run:
+                print("Dry run: skipping Discord notification")
+            else:
+                await self.send_discord_notification(session, updated_mods)
         else:
             print("No mod updates found")
 
-    def run_monitor(self, check_interval=3600):  # Default: check every hour
+    async def run_monitor(self, check_interval=3600):  # Default: check every hour
         """Run continuous monitoring"""
         print("Starting DayZ mod update monitor...")
         print(f"Monitoring {len(self.mod_ids)} mods")
         print(f"Check interval: {check_interval} seconds")
         
-        while True:
-            try:
-                self.run_check()
-                print(f"Next check in {check_interval} seconds...")
-                time.sleep(check_interval)
-            except KeyboardInterrupt:
-                print("\nMonitoring stopped by user")
-                break
-            except Exception as e:
-                print(f"Error during monitoring: {e}")
-                print("Continuing in 60 seconds...")
-                time.sleep(60)
+        # Schedule checks on a fixed monotonic grid so check duration doesn't add drift
+        next_run = time.monotonic()
+        async with self.create_session() as session:
+            while True:
+                try:
+                    await self.run_check_async(session)
+                    next_run += check_interval
+                except Exception as e:
+                    print(f"Error during monitoring: {e}")
+                    print("Continuing in 60 seconds...")
+                    next_run = time.monotonic() + 60
+                
+                # Skip slots missed by a check that overran the interval
+                now = time.monotonic()
+                if next_run < now:
+                    next_run = now
+                
+                print(f"Next check in {next_run - now:.0f} seconds...")
+                await asyncio.sleep(next_run - now)
 
 def main():
     """Main function"""
-    # Configuration
-    DISCORD_WEBHOOK_URL = "https://discordapp.com/api/webhooks/1424699281352163390/62VXQ3nus7y7TEt8sdw6Ltt2sWgHyLoiC6quzXovY1g_kg7h0be-BHD3jN3Yg6HlXr5I"
-    STEAM_API_KEY = "FB4A48C58C7778630BFDE1A9D5F5A94A"
+    args = sys.argv[1:]
+    # --dry-run uses the normal database but rolls back its writes and skips
+    # Discord, so it never consumes updates the real monitor should announce
+    dry_run = "--dry-run" in args
+    
+    # The webhook is only needed when notifications are actually sent
+    required = [("STEAM_API_KEY", STEAM_API_KEY)]
+    if not dry_run:
+        required.append(("DISCORD_WEBHOOK_URL", DISCORD_WEBHOOK_URL))
+    missing = [name for name, value in required if not value]
+    if missing:
+        sys.exit(f"Missing required environment variable(s): {', '.join(missing)}")
     
     # Create notifier instance
-    notifier = DayZModNotifier(DISCORD_WEBHOOK_URL, STEAM_API_KEY)
+    notifier = DayZModNotifier(DISCORD_WEBHOOK_URL, STEAM_API_KEY, dry_run=dry_run)
     
-    # Choose mode: single check or continuous monitoring
-    if len(sys.argv) > 1 and sys.argv[1] == "--once":
-        notifier.run_check()
-    else:
-        # Run continuous monitoring (check every hour)
-        notifier.run_monitor(3600)
+    try:
+        # Choose mode: single check or continuous monitoring
+        if "--once" in args:
+            notifier.run_check()
+        else:
+            # Run continuous monitoring (check every hour)
+            asyncio.run(notifier.run_monitor(3600))
+    except KeyboardInterrupt:
+        print("\nMonitoring stopped by user")
+    finally:
+        notifier.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file